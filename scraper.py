@@ -1,13 +1,15 @@
 import requests
 import pandas as pd
-import time
 from tqdm import tqdm
 import logging
 import csv
+import os
 import json
+import orjson
 import re
 import unicodedata
-import random
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -25,39 +27,20 @@ if not logger.handlers:
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
 
-class RateLimiter:
-    """
-    Garante um intervalo mínimo entre chamadas, com jitter opcional.
-    Use instâncias separadas para 'search' e 'detail' se desejar ritmos diferentes.
-    """
-    def __init__(self, min_interval_seconds=3.0, jitter_seconds=0.5, label="global"):
-        self.min_interval = float(min_interval_seconds)
-        self.jitter = float(jitter_seconds)
-        self._last_ts = 0.0
-        self.label = label
-
-    def wait(self):
-        if self.min_interval <= 0:
-            return
-        now = time.monotonic()
-        elapsed = now - self._last_ts
-        base_sleep = max(0.0, self.min_interval - elapsed)
-        jitter = random.uniform(0, self.jitter) if self.jitter > 0 else 0.0
-        to_sleep = base_sleep + jitter
-        if to_sleep > 0:
-            logger.info(f"Rate limit ({self.label}): aguardando {to_sleep:.2f}s "
-                        f"(mín {self.min_interval:.2f}s + jitter {jitter:.2f}s).")
-            time.sleep(to_sleep)
-        self._last_ts = time.monotonic()
-
 class BaseGovAPIScraper:
     """
-    Scraper com deduplicação por ID, agregação de keywords e rate limiting:
-    - Busca/paginação: 3s (+ ~0.7s jitter) entre chamadas
-    - Detalhe: 1s (+ ~0.3s jitter) entre chamadas
+    Scraper com deduplicação por ID, agregação de keywords e ritmo adaptativo:
+    - Até MAX_WORKERS pedidos em voo em simultâneo (ThreadPoolExecutor)
+    - Sem intervalos fixos: 429/5xx são repetidos com backoff exponencial, respeitando Retry-After
     """
     API_URL = "https://www.base.gov.pt/Base4/pt/resultados/"
     DETAIL_PAGE_URL = "https://www.base.gov.pt/Base4/pt/detalhe/?type=contratos&id={}"
+    # Campos do detalhe usados em _build_record / _build_fuzzy_key
+    DETAIL_FIELDS = ('description', 'executionPlace', 'contracting', 'contracted',
+                     'initialContractualPrice', 'signingDate', 'publicationDate')
+    CSV_HEADERS = ['Distrito', 'Município', 'Palavra-Chave Encontrada', 'Objeto do Contrato',
+                   'Entidade Contratante', 'Adjudicatário', 'Valor (€)', 'Data do Contrato',
+                   'Publicação', 'Link', 'ID Contrato']
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:141.0) Gecko/20100101 Firefox/141.0',
         'X-Requested-With': 'XMLHttpRequest',
@@ -67,18 +50,34 @@ class BaseGovAPIScraper:
     }
 
     # Parâmetros de comportamento (ajuste aqui, se necessário)
-    SEARCH_RATE_SECONDS = 3.0     # intervalo mínimo entre chamadas de busca
-    SEARCH_JITTER_SECONDS = 0.7   # jitter adicional para busca
-    DETAIL_RATE_SECONDS = 1.0     # intervalo mínimo entre chamadas de detalhe
-    DETAIL_JITTER_SECONDS = 0.3   # jitter adicional para detalhe
     PAGE_SIZE = 100
+    MAX_WORKERS = 16              # pedidos simultâneos (busca e detalhe)
+    POOL_CONNECTIONS = 1          # pools de ligação (urllib3): um único host, base.gov.pt
+    POOL_MAXSIZE = MAX_WORKERS    # um socket keep-alive (um handshake TLS) por worker
+    CSV_BUFFER_BYTES = 1 << 20    # buffer de escrita dos CSV
+    OUTPUT_FILE = "reporte_FINAL_Centro.csv"
+    STREAM_FLUSH_ROWS = 100       # flush do CSV parcial (.partial) a cada N registos
+    PROGRESS_MIN_INTERVAL = 1.0   # s entre redesenhos do tqdm (rajadas de conclusões em paralelo)
     ENABLE_FUZZY_DEDUPE = False   # opcional: dedupe adicional por hash de campos
+    ENABLE_INCREMENTAL = False    # opcional: pára a paginação no cursor da execução anterior
+    ENABLE_SEARCH_PREFILTER = True  # descarta IDs pela localização da pesquisa, antes do detalhe
+    CURSOR_FILE = 'cursors.json'  # publicationDate mais recente por (keyword normalizada, distrito)
+
+    # Regexes pré-compiladas (usadas em cada normalização / registo)
+    _NORM_RE = re.compile(r'[^a-z0-9]+')
+    _SPLIT_RE = re.compile(r'[,;/|]+')
+    # Acentos portugueses -> ASCII: caminho rápido (str.translate, em C) de _normalize_text
+    _ACCENT_TABLE = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüç', 'aaaaaeeeeiiiiooooouuuuc')
+
+    # Formatos de data da API, tentados por strptime antes do parser (lento) do pandas
+    _DATE_FORMATS = ('%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y')
+    _date_format = None           # último formato reconhecido (cache)
 
     def __init__(self, keywords, districts):
         self.keywords = keywords
         self.target_districts = districts
 
-        # Sessão com retries e backoff
+        # Sessão com retries e backoff: é o que regula o ritmo face ao servidor (429 + Retry-After)
         self.session = requests.Session()
         self.session.headers.update(self.HEADERS)
 
@@ -88,11 +87,15 @@ class BaseGovAPIScraper:
             read=5,
             status=5,
             backoff_factor=2,  # 0, 2, 4, 8, 16s ...
+            backoff_max=60,
             status_forcelist=(429, 500, 502, 503, 504),
             allowed_methods=frozenset(['GET', 'POST']),
             respect_retry_after_header=True,
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        # Pool dimensionado para os workers, para reaproveitar ligações keep-alive entre threads;
+        # pool_block impede sockets extra (e handshakes TLS) além de POOL_MAXSIZE
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=self.POOL_CONNECTIONS,
+                              pool_maxsize=self.POOL_MAXSIZE, pool_block=True)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
@@ -102,20 +105,27 @@ class BaseGovAPIScraper:
         except requests.RequestException as e:
             logger.warning(f"Falha ao inicializar sessão (seguiremos mesmo assim): {e}")
 
-        # Rate limiters (tempos mais baixos e com jitter)
-        self.search_rl = RateLimiter(self.SEARCH_RATE_SECONDS, self.SEARCH_JITTER_SECONDS, label="search")
-        self.detail_rl = RateLimiter(self.DETAIL_RATE_SECONDS, self.DETAIL_JITTER_SECONDS, label="detail")
+        # Cursores incrementais: "keyword_normalizada:distrito" -> data ISO mais recente já vista
+        self._cursors = self._load_cursors() if self.ENABLE_INCREMENTAL else {}
+        self._new_cursors = {}
 
         # Mapa de distritos normalizados -> nome original
         self.normalized_districts = {self._normalize_text(name): name for name in self.target_districts.keys()}
+        # Uma única alternância para todos os distritos (os nomes mais longos primeiro)
+        alternatives = sorted(filter(None, self.normalized_districts), key=len, reverse=True)
+        self._district_re = (re.compile(r'\b(' + '|'.join(map(re.escape, alternatives)) + r')\b')
+                             if alternatives else None)
 
     # --- Normalizações e utilidades ---
     def _normalize_text(self, s):
         if not s:
             return ''
-        s = unicodedata.normalize('NFKD', str(s)).encode('ascii', 'ignore').decode('ascii')
-        s = s.lower()
-        s = re.sub(r'[^a-z0-9]+', ' ', s).strip()
+        s = str(s).lower().translate(self._ACCENT_TABLE)
+        if not s.isascii():
+            # Fora do alfabeto português: NFKD completo; volta a baixar a caixa porque há
+            # compatibilidades que decompõem em maiúsculas ASCII (ex.: '№' -> 'No', '™' -> 'TM')
+            s = unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii').lower()
+        s = self._NORM_RE.sub(' ', s).strip()
         return s
 
     def _normalize_keyword(self, kw):
@@ -135,31 +145,90 @@ class BaseGovAPIScraper:
     def _find_actual_district(self, execution_place):
         if not execution_place:
             return ''
-        parts = re.split(r'[,;/|]+', execution_place)
+        parts = self._SPLIT_RE.split(execution_place)
         for part in parts:
             n = self._normalize_text(part)
             if n in self.normalized_districts:
                 return self.normalized_districts[n]
-        full = self._normalize_text(execution_place)
-        for nname, original in self.normalized_districts.items():
-            if re.search(r'\b' + re.escape(nname) + r'\b', full):
-                return original
-        return ''
-
-    # --- Acesso à API com rate limiting ---
-    def _post_api(self, url, payload, headers=None, kind="search", timeout=30):
-        # Aplica o rate limit antes de cada chamada
-        if kind == "search":
-            self.search_rl.wait()
-        else:
-            self.detail_rl.wait()
+        if self._district_re is None:
+            return ''
+        m = self._district_re.search(self._normalize_text(execution_place))
+        return self.normalized_districts[m.group(1)] if m else ''
+
+    def _strptime(self, date_string):
+        """
+        Interpreta uma data da API com datetime.strptime, começando pelo último formato reconhecido.
+        Só recorre a pd.to_datetime (dayfirst) para formatos fora de _DATE_FORMATS.
+        """
+        value = date_string.strip()[:10]
+        cached = self._date_format
+        for fmt in ((cached,) if cached else ()) + self._DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            self._date_format = fmt
+            return parsed
+        ts = pd.to_datetime(date_string, dayfirst=True, errors='coerce')
+        return None if pd.isna(ts) else ts.to_pydatetime()
+
+    def _parse_date(self, date_string):
+        """Data da API -> 'AAAA-MM-DD' (ordenável como string) ou None."""
+        if not date_string or not isinstance(date_string, str):
+            return None
+        parsed = self._strptime(date_string)
+        return parsed.strftime('%Y-%m-%d') if parsed else None
+
+    # --- Cursores incrementais ---
+    def _cursor_key(self, keyword, district_id):
+        return f"{self._normalize_keyword(keyword)}:{district_id}"
+
+    def _load_cursors(self):
+        try:
+            with open(self.CURSOR_FILE, encoding='utf-8') as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Cursores ignorados, não foi possível ler '{self.CURSOR_FILE}': {e}")
+            return {}
+
+    def _save_cursors(self):
+        cursors = {**self._cursors, **self._new_cursors}
+        try:
+            with open(self.CURSOR_FILE, 'w', encoding='utf-8') as fh:
+                json.dump(cursors, fh, ensure_ascii=False, indent=2, sort_keys=True)
+            logger.info(f"Cursores atualizados ({len(self._new_cursors)} novos) em '{self.CURSOR_FILE}'")
+        except OSError as e:
+            logger.error(f"Falha ao guardar cursores em '{self.CURSOR_FILE}': {e}")
+
+    # --- Acesso à API ---
+    def _post_api(self, url, payload, headers=None, timeout=30):
         response = self.session.post(url, data=payload, headers=headers or {}, timeout=timeout)
         response.raise_for_status()
         return response
 
+    def _build_queries(self):
+        """
+        Agrupa as keywords em consultas de descoberta, devolvendo [(texto, keywords)]:
+        keywords equivalentes após normalização ("Wi-Fi"/"WI-FI") partilham uma consulta.
+        Variantes distintas (ex.: "Cloud"/"Nuvem") são pesquisadas em separado: a gramática do
+        campo texto= não está documentada e não foi validada (ex.: suporte a OR).
+        """
+        by_norm = {}
+        for kw in self.keywords:
+            by_norm.setdefault(self._normalize_keyword(kw), []).append(kw)
+        return [(variants[0], variants) for variants in by_norm.values()]
+
     def _discover_contract_ids(self, keyword, district_id):
-        discovered_ids = set()
+        # ID -> executionPlace do resultado de pesquisa (None se a API não o devolver como texto)
+        discovered = {}
         page = 0
+        # Modo incremental: resultados vêm por -publicationDate, por isso basta paginar até ao cursor
+        cursor_key = self._cursor_key(keyword, district_id)
+        cursor = self._cursors.get(cursor_key) if self.ENABLE_INCREMENTAL else None
+        newest = None
+        complete = False
         while True:
             payload = {
                 'type': 'search_contratos',
@@ -170,17 +239,29 @@ class BaseGovAPIScraper:
                 'size': self.PAGE_SIZE
             }
             try:
-                response = self._post_api(self.API_URL, payload, kind="search", timeout=60)
-                data = response.json()
+                response = self._post_api(self.API_URL, payload, timeout=60)
+                data = orjson.loads(response.content)
                 items = data.get('items') if data else None
                 if items:
+                    reached_cursor = False
                     for item in items:
-                        if 'id' in item:
-                            discovered_ids.add(item['id'])
-                    if len(items) < self.PAGE_SIZE:
+                        if 'id' not in item:
+                            continue
+                        if self.ENABLE_INCREMENTAL:
+                            pub = self._parse_date(item.get('publicationDate'))
+                            if pub and (newest is None or pub > newest):
+                                newest = pub
+                            if cursor and pub and pub < cursor:
+                                reached_cursor = True
+                                continue
+                        place = item.get('executionPlace')
+                        discovered[item['id']] = place if isinstance(place, str) else None
+                    if reached_cursor or len(items) < self.PAGE_SIZE:
+                        complete = True
                         break
                     page += 1
                 else:
+                    complete = True
                     break
             except requests.RequestException as e:
                 logger.error(f"Erro na descoberta para '{keyword}' (distrito {district_id}) pág {page}: {e}")
@@ -188,25 +269,66 @@ class BaseGovAPIScraper:
             except json.JSONDecodeError as e:
                 logger.error(f"JSON inválido na descoberta para '{keyword}' pág {page}: {e}")
                 break
-        return list(discovered_ids)
+        # Só avança o cursor se a paginação terminou sem erros (senão perder-se-iam páginas)
+        if complete and newest and (cursor is None or newest > cursor):
+            self._new_cursors[cursor_key] = newest
+        return discovered
 
-    def _get_details_from_api(self, contract_id):
+    def _get_details_from_api(self, contract_id, link=None):
         try:
             payload = {'id': contract_id, 'type': 'detail_contratos', 'version': '141.0'}
-            detail_headers = {'Referer': self.DETAIL_PAGE_URL.format(contract_id)}
-            response = self._post_api(self.API_URL, payload, headers=detail_headers, kind="detail", timeout=60)
-            return response.json()
+            detail_headers = {'Referer': link or self.DETAIL_PAGE_URL.format(contract_id)}
+            response = self._post_api(self.API_URL, payload, headers=detail_headers, timeout=60)
+            data = orjson.loads(response.content)
         except (requests.RequestException, json.JSONDecodeError) as e:
             logger.error(f"Não foi possível obter detalhes da API para o ID {contract_id}. Erro: {e}")
             return None
+        # Mantém só os campos usados (documentos, modificações etc. são descartados já aqui)
+        if not isinstance(data, dict):
+            return data
+        return {k: data[k] for k in self.DETAIL_FIELDS if k in data}
 
     def _format_date(self, date_string):
         if not date_string or not isinstance(date_string, str):
             return ''
-        try:
-            return pd.to_datetime(date_string, dayfirst=True, errors='coerce').strftime('%d/%m/%Y')
-        except Exception:
-            return date_string
+        parsed = self._strptime(date_string)
+        return parsed.strftime('%d/%m/%Y') if parsed else date_string
+
+    def _format_date_series(self, series):
+        """
+        Versão vetorizada de _format_date, com o mesmo resultado independentemente da ordem das
+        linhas: cada valor é tentado com format= em todos os _DATE_FORMATS (caminho rápido) e só
+        os restantes passam, um a um, por _format_date.
+        """
+        raw = series.fillna('').astype(str)
+        values = raw.str.strip().str.slice(0, 10)
+        parsed = pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]')
+        pending = raw.ne('')
+        cached = self._date_format  # só define a ordem das tentativas, não o resultado
+        for fmt in ((cached,) if cached else ()) + tuple(f for f in self._DATE_FORMATS if f != cached):
+            if not pending.any():
+                break
+            attempt = pd.to_datetime(values.where(pending, ''), format=fmt, errors='coerce')
+            parsed = parsed.mask(parsed.isna(), attempt)
+            pending &= attempt.isna()
+        formatted = parsed.dt.strftime('%d/%m/%Y').where(parsed.notna(), raw)
+        if pending.any():
+            formatted[pending] = raw[pending].map(self._format_date)
+        return formatted
+
+    def _parse_columns(self, df):
+        """Converte valor e datas de todos os registos de uma só vez (operações de Series)."""
+        df['Valor (€)'] = pd.to_numeric(
+            df['Valor (€)'].astype(str)
+            .str.replace('€', '', regex=False)
+            .str.replace('.', '', regex=False)
+            .str.replace(',', '.', regex=False)
+            .str.strip(),
+            errors='coerce'
+        ).astype('float64')
+        df['Data do Contrato'] = self._format_date_series(df['Data do Contrato'])
+        df['Publicação'] = self._format_date_series(df['Publicação'])
+        return df
 
     def _build_fuzzy_key(self, details_json):
         """
@@ -232,102 +354,232 @@ class BaseGovAPIScraper:
         except Exception:
             return None
 
-    # --- Workflow principal ---
-    def run(self):
-        logger.info("Início com deduplicação por ID e rate limit reduzido (3s busca, 1s detalhe, com jitter).")
-        all_contracts_data = []
+    def _may_be_in_scope(self, meta):
+        """
+        False só quando todas as localizações vistas na pesquisa são conhecidas e nenhuma
+        corresponde a um distrito alvo; sem localização na pesquisa, o detalhe decide.
+        """
+        return any(not place or self._find_actual_district(place) for place in meta['places'])
+
+    def _build_record(self, contract_id, meta, details_json, link):
+        location_string = details_json.get('executionPlace', '') or ''
+        actual_district = self._find_actual_district(location_string)
+        if not actual_district:
+            logger.debug(f"Contrato {contract_id} ignorado. Localização '{location_string}' fora do escopo.")
+            return None
 
-        # 1) keyword x distrito
-        search_space = [(kw, dn, did) for kw in self.keywords for dn, did in self.target_districts.items()]
+        # contratados
+        contracted = details_json.get('contracted', [])
+        if isinstance(contracted, dict): contracted = [contracted]
+        adjudicatario_nome = contracted[0].get('description', '') if contracted else ''
+
+        # contratante
+        contracting = details_json.get('contracting', [])
+        if isinstance(contracting, dict): contracting = [contracting]
+        entidade_contratante = contracting[0].get('description', '') if contracting else ''
+
+        # valor e datas seguem em bruto; a conversão é vetorizada em _parse_columns
+        return {
+            'Distrito': actual_district,
+            'Município': location_string,
+            'Palavra-Chave Encontrada': self._join_unique_keywords(meta['keywords']),
+            'Objeto do Contrato': details_json.get('description', ''),
+            'Entidade Contratante': entidade_contratante,
+            'Adjudicatário': adjudicatario_nome,
+            'Valor (€)': str(details_json.get('initialContractualPrice', '0')),
+            'Data do Contrato': details_json.get('signingDate'),
+            'Publicação': details_json.get('publicationDate'),
+            'Link': link,
+            'ID Contrato': contract_id
+        }
 
-        # 2) Descobrir IDs e indexar: ID -> {keywords: set(), distritos: set()}
+    # --- Workflow principal ---
+    def run(self):
+        logger.info(f"Início com deduplicação por ID, até {self.MAX_WORKERS} pedidos simultâneos "
+                    "(ritmo regulado por retry/backoff).")
+
+        # 1) consultas x distrito (ver _build_queries); os pedidos são submetidos diretamente
+        #    a partir do produto, sem materializar a lista de tuplos do espaço de pesquisa
+        queries = self._build_queries()
+        districts = list(self.target_districts.items())
+        skipped = (len(self.keywords) - len(queries)) * len(self.target_districts)
+        if skipped:
+            logger.info(f"{skipped} consultas evitadas por keywords equivalentes após normalização.")
+
+        # 2) Descobrir IDs (em paralelo) e indexar: ID -> {keywords, distritos, localizações}
         contracts_index = {}
         total_hits = 0
-        for keyword, district_name_query, district_id in tqdm(search_space, desc="Descobrindo IDs"):
-            contract_ids = self._discover_contract_ids(keyword, district_id)
-            total_hits += len(contract_ids)
-            logger.info(f"Encontrados {len(contract_ids)} contratos para '{keyword}' em '{district_name_query}'.")
-            for cid in contract_ids:
-                entry = contracts_index.get(cid)
-                if entry is None:
-                    entry = {'keywords': set(), 'districts': set()}
-                    contracts_index[cid] = entry
-                entry['keywords'].add(keyword)
-                entry['districts'].add(district_name_query)
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(self._discover_contract_ids, text, did): (text, kws, dn)
+                for text, kws in queries
+                for dn, did in districts
+            }
+            # Em caso de erro/Ctrl-C, cancela os pedidos ainda em fila em vez de os executar todos
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Descobrindo IDs",
+                                   mininterval=self.PROGRESS_MIN_INTERVAL):
+                    text, keywords, district_name_query = futures.pop(future)
+                    contract_ids = future.result()
+                    total_hits += len(contract_ids)
+                    logger.info(f"Encontrados {len(contract_ids)} contratos para '{text}' em '{district_name_query}'.")
+                    for cid, place in contract_ids.items():
+                        entry = contracts_index.get(cid)
+                        if entry is None:
+                            entry = {'keywords': set(), 'districts': set(), 'places': set()}
+                            contracts_index[cid] = entry
+                        entry['keywords'].update(keywords)
+                        entry['districts'].add(district_name_query)
+                        entry['places'].add(place)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
 
         logger.info(f"IDs descobertos (brutos): {total_hits} | IDs únicos: {len(contracts_index)}")
 
-        # 3) Enriquecer detalhes UMA VEZ por ID e filtrar por distrito efetivo
+        # 3) Pré-filtro: evita o pedido de detalhe quando a pesquisa já mostra localização fora do escopo.
+        #    Assume que o executionPlace da pesquisa é o mesmo do detalhe; desligar com
+        #    ENABLE_SEARCH_PREFILTER = False se houver dúvidas.
+        to_fetch = {}
+        for cid, meta in contracts_index.items():
+            if not self.ENABLE_SEARCH_PREFILTER or self._may_be_in_scope(meta):
+                to_fetch[cid] = meta
+            else:
+                logger.debug(f"Contrato {cid} descartado antes do detalhe. Localização da pesquisa "
+                             f"{sorted(p for p in meta['places'] if p)} fora do escopo.")
+        if len(to_fetch) < len(contracts_index):
+            logger.info(f"{len(contracts_index) - len(to_fetch)} IDs descartados antes do detalhe "
+                        f"(localização da pesquisa fora do escopo).")
+
+        # 4) Enriquecer detalhes UMA VEZ por ID (em paralelo), filtrar por distrito efetivo e
+        #    gravar cada registo num CSV parcial à medida que chega: só as respostas ainda por
+        #    tratar ficam em memória, e os registos já gravados sobrevivem a uma interrupção
         fuzzy_seen = set()
-        for contract_id, meta in tqdm(contracts_index.items(), desc="Obtendo detalhes únicos", leave=False):
-            details_json = self._get_details_from_api(contract_id)
-            if not details_json:
-                continue
-
-            location_string = details_json.get('executionPlace', '') or ''
-            actual_district = self._find_actual_district(location_string)
-            if not actual_district:
-                logger.debug(f"Contrato {contract_id} ignorado. Localização '{location_string}' fora do escopo.")
-                continue
-
-            # contratados
-            contracted = details_json.get('contracted', [])
-            if isinstance(contracted, dict): contracted = [contracted]
-            adjudicatario_nome = contracted[0].get('description', '') if contracted else ''
-
-            # contratante
-            contracting = details_json.get('contracting', [])
-            if isinstance(contracting, dict): contracting = [contracting]
-            entidade_contratante = contracting[0].get('description', '') if contracting else ''
-
-            # valor
-            raw_valor = str(details_json.get('initialContractualPrice', '0'))
-            valor_num = pd.to_numeric(
-                raw_valor.replace('€', '').replace('.', '').replace(',', '.').strip(),
-                errors='coerce'
-            )
-
-            record = {
-                'Distrito': actual_district,
-                'Município': location_string,
-                'Palavra-Chave Encontrada': self._join_unique_keywords(meta['keywords']),
-                'Objeto do Contrato': details_json.get('description', ''),
-                'Entidade Contratante': entidade_contratante,
-                'Adjudicatário': adjudicatario_nome,
-                'Valor (€)': valor_num,
-                'Data do Contrato': self._format_date(details_json.get('signingDate')),
-                'Publicação': self._format_date(details_json.get('publicationDate')),
-                'Link': self.DETAIL_PAGE_URL.format(contract_id),
-                'ID Contrato': contract_id
-            }
-
-            # Dedupe fuzzy opcional
-            if self.ENABLE_FUZZY_DEDUPE:
-                key = self._build_fuzzy_key(details_json)
-                if key and key in fuzzy_seen:
-                    logger.info(f"Removendo quase-duplicata (fuzzy) ID {contract_id}")
-                    continue
-                if key:
-                    fuzzy_seen.add(key)
-
-            all_contracts_data.append(record)
+        failed_details = 0
+        written = 0
+        partial_file = self.OUTPUT_FILE + '.partial'
+        with open(partial_file, 'w', newline='', encoding='utf-8', buffering=self.CSV_BUFFER_BYTES) as fh, \
+                ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            writer = csv.DictWriter(fh, fieldnames=self.CSV_HEADERS, delimiter=';', extrasaction='ignore')
+            writer.writeheader()
+            # Link formatado uma vez por ID: serve de Referer e de coluna 'Link'
+            futures = {}
+            for cid, meta in to_fetch.items():
+                link = self.DETAIL_PAGE_URL.format(cid)
+                futures[executor.submit(self._get_details_from_api, cid, link)] = (cid, meta, link)
+            # Como na descoberta: uma interrupção cancela a fila em vez de continuar a pedir detalhes
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Obtendo detalhes únicos",
+                                   leave=False, mininterval=self.PROGRESS_MIN_INTERVAL):
+                    # pop: o Future (e o JSON do detalhe) deixa de ser referenciado após o tratamento
+                    contract_id, meta, link = futures.pop(future)
+                    details_json = future.result()
+                    if details_json is None:
+                        failed_details += 1
+                    if not details_json:
+                        continue
+
+                    record = self._build_record(contract_id, meta, details_json, link)
+                    if record is None:
+                        continue
+
+                    # Dedupe fuzzy opcional
+                    if self.ENABLE_FUZZY_DEDUPE:
+                        key = self._build_fuzzy_key(details_json)
+                        if key and key in fuzzy_seen:
+                            logger.info(f"Removendo quase-duplicata (fuzzy) ID {contract_id}")
+                            continue
+                        if key:
+                            fuzzy_seen.add(key)
+
+                    writer.writerow(record)
+                    written += 1
+                    if written % self.STREAM_FLUSH_ROWS == 0:
+                        fh.flush()
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        logger.info(f"Extração completa. Total de {written} contratos válidos (deduplicados por ID).")
+        # Relatório final: uma passagem pandas sobre o parcial (conversões, ordenação)
+        df = pd.read_csv(partial_file, sep=';', usecols=self.CSV_HEADERS, dtype=str,
+                         keep_default_na=False, encoding='utf-8')
+        report_saved = self.save_to_csv(df)
+        if report_saved or not written:
+            os.remove(partial_file)
+        else:
+            logger.warning(f"Registos preservados em '{partial_file}'.")
+
+        # 5) Cursores só avançam quando todos os detalhes foram obtidos e o relatório foi gravado
+        if self.ENABLE_INCREMENTAL:
+            if failed_details:
+                logger.warning(f"{failed_details} detalhes falharam; cursores mantidos para a próxima execução.")
+            elif written and not report_saved:
+                logger.warning("Relatório não gravado; cursores mantidos para a próxima execução.")
+            else:
+                self._save_cursors()
+
+    def _merge_previous_report(self, df, filename):
+        """
+        Junta df (já convertido) ao relatório existente, com prioridade para as linhas novas
+        (dedupe por ID), exceto nas palavras-chave, que são a união das duas execuções.
+        Devolve None se o relatório anterior existir mas não puder ser lido, para não o
+        substituir só pelos contratos novos.
+        """
+        if not os.path.isfile(filename):
+            return df
+        try:
+            previous = pd.read_csv(filename, sep=';', usecols=self.CSV_HEADERS, dtype=str,
+                                   keep_default_na=False, encoding='utf-8-sig')
+        except Exception as e:
+            logger.critical(f"Não foi possível ler o relatório anterior '{filename}' para juntar: {e}")
+            return None
+        # O relatório anterior já tem datas formatadas; só o valor volta a numérico
+        previous['Valor (€)'] = pd.to_numeric(previous['Valor (€)'], errors='coerce').astype('float64')
+        # Um contrato reencontrado por menos palavras-chave não perde as que já tinha
+        kw_col = 'Palavra-Chave Encontrada'
+        previous_kw = previous.drop_duplicates(subset=['ID Contrato']).set_index('ID Contrato')[kw_col]
+        old_kw = df['ID Contrato'].map(previous_kw)
+        seen_before = old_kw.notna()
+        if seen_before.any():
+            df = df.copy()
+            df.loc[seen_before, kw_col] = [
+                self._join_unique_keywords(set(new.split(' | ')) | set(old.split(' | ')))
+                for new, old in zip(df.loc[seen_before, kw_col], old_kw[seen_before])
+            ]
+        merged = pd.concat([df, previous], ignore_index=True)
+        merged = merged.drop_duplicates(subset=['ID Contrato'], keep='first')
+        logger.info(f"Relatório incremental: {len(df)} contratos novos/atualizados + "
+                    f"{len(merged) - len(df)} da execução anterior.")
+        return merged
+
+    def save_to_csv(self, data, filename=None):
+        """Grava o relatório final (lista de registos ou DataFrame); devolve True se o ficheiro foi escrito."""
+        filename = filename or self.OUTPUT_FILE
+        if data is None or len(data) == 0:
+            logger.warning("Nenhum dado para guardar.")
+            return False
 
-        logger.info(f"Extração completa. Total de {len(all_contracts_data)} contratos válidos (deduplicados por ID).")
-        self.save_to_csv(all_contracts_data)
+        # Esquema conhecido: colunas fixas, sem inferência de tipos linha a linha
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(data, columns=self.CSV_HEADERS)
 
-    def save_to_csv(self, data, filename="reporte_FINAL_Centro.csv"):
-        if not data:
-            logger.warning("Nenhum dado para guardar.")
-            return
+        # Segurança extra: remover duplicatas por ID. run() já grava um registo por ID único
+        # (contracts_index), por isso a passagem só corre com o dedupe fuzzy ativo.
+        if self.ENABLE_FUZZY_DEDUPE:
+            before = len(df)
+            df = df.drop_duplicates(subset=['ID Contrato'], keep='first')
+            after = len(df)
+            if after < before:
+                logger.info(f"Removidas {before - after} duplicatas na gravação (por ID Contrato).")
 
-        df = pd.DataFrame(data)
+        # Conversões vetorizadas (valor e datas)
+        df = self._parse_columns(df)
 
-        # Segurança extra: remover duplicatas por ID
-        before = len(df)
-        df = df.drop_duplicates(subset=['ID Contrato'], keep='first').copy()
-        after = len(df)
-        if after < before:
-            logger.info(f"Removidas {before - after} duplicatas na gravação (por ID Contrato).")
+        # Modo incremental: os novos contratos juntam-se ao relatório anterior em vez de o substituir
+        if self.ENABLE_INCREMENTAL:
+            df = self._merge_previous_report(df, filename)
+            if df is None:
+                return False
 
         # Ordenação por publicação (mais recente primeiro)
         if 'Publicação' in df.columns:
@@ -337,17 +589,17 @@ class BaseGovAPIScraper:
             except Exception:
                 pass
 
-        headers = ['Distrito', 'Município', 'Palavra-Chave Encontrada', 'Objeto do Contrato',
-                   'Entidade Contratante', 'Adjudicatário', 'Valor (€)', 'Data do Contrato',
-                   'Publicação', 'Link', 'ID Contrato']
         try:
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=headers, delimiter=';', extrasaction='ignore')
-                writer.writeheader()
-                writer.writerows(df.to_dict(orient='records'))
+            # Escrita direta pelo writer do pandas, em blocos, sem lista intermédia de dicts,
+            # sobre um buffer de 1 MiB (o padrão de 8 KiB multiplica as syscalls); CRLF como o csv.DictWriter
+            with open(filename, 'w', newline='', encoding='utf-8-sig', buffering=self.CSV_BUFFER_BYTES) as csvfile:
+                df[self.CSV_HEADERS].to_csv(csvfile, sep=';', index=False, chunksize=10000,
+                                            lineterminator='\r\n')
             logger.info(f"Relatório final guardado com sucesso em '{filename}'")
+            return True
         except Exception as e:
             logger.critical(f"Falha CRÍTICA ao guardar o ficheiro CSV: {e}")
+            return False
 
 
 if __name__ == "__main__":